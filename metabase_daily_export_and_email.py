@@ -1,45 +1,117 @@
 #!/usr/bin/env python3
 import os
+import argparse
 import requests
 import tempfile
+import shutil
 import zipfile
 import smtplib
 import ssl
+import base64
+import uuid
+import random
 from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
 from datetime import datetime
 import re
+import unicodedata
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ---------- Environment ----------
-METABASE_SITE = os.getenv("METABASE_SITE").rstrip("/")
+# Checked by require_env() from main(), so --help works without secrets
+REQUIRED_ENV = (
+    "METABASE_SITE", "METABASE_API_KEY",
+    "SMTP_HOST", "SMTP_USER", "SMTP_PASS", "FROM_EMAIL", "TO_EMAIL",
+)
+
+METABASE_SITE = (os.getenv("METABASE_SITE") or "").rstrip("/")
 METABASE_API_KEY = os.getenv("METABASE_API_KEY")
 
 SMTP_HOST = os.getenv("SMTP_HOST")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+# An unset workflow secret arrives as "", not as a missing variable
+SMTP_PORT = int(os.getenv("SMTP_PORT") or "587")
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
 FROM_EMAIL = os.getenv("FROM_EMAIL")
 TO_EMAIL = os.getenv("TO_EMAIL")
 CC_EMAIL = os.getenv("CC_EMAIL", "")
 
+def require_env():
+    missing = [name for name in REQUIRED_ENV if not os.getenv(name)]
+    if missing:
+        raise SystemExit(f"Missing required environment variables: {', '.join(missing)}")
+
 CARD_IDS = [8266, 8267]
 CARD_PARAMS = {}
+MIN_POOL_SIZE = 16
 VERIFY_SSL = True
+CHUNK_SIZE = 1024 * 1024  # 1 MiB; small chunks make large downloads crawl
+SPOOL_MAX = 64 * 1024 * 1024  # per-card download kept in RAM up to this size
+# On the wire the zip grows by 4/3 (base64) and 78/76 (CRLF per 76-char
+# line), so 17 MB becomes ~23.3 MB: under the common 25 MB cap with room
+# for headers
+MAX_ZIP_BYTES = 17_000_000
 
 # ---------- Helpers ----------
+FILENAME_UNSAFE_RE = re.compile(r'[^A-Za-z0-9]+')
+
 def clean_filename(name):
-    return re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_')
+    if not name.isascii():
+        # NFKD + ascii-ignore keeps "é" as "e" and drops what has no ASCII form
+        name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return FILENAME_UNSAFE_RE.sub('_', name).strip('_')
+
+class CappedRetry(Retry):
+    """Retry with jitter on every backoff and Retry-After capped at backoff_max.
 
-def make_session():
+    urllib3 returns no backoff at all for the first retry (before its own
+    backoff_jitter is applied) and sleeps for whatever Retry-After the
+    server sends.
+    """
+
+    def get_backoff_time(self):
+        # Up to backoff_factor of random extra wait on every retry, including
+        # the first, so jobs that failed on the same cron tick spread out
+        backoff = super().get_backoff_time() + random.uniform(0, self.backoff_factor)
+        return min(self.backoff_max, backoff)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.backoff_max)
+
+def make_session(pool_size=MIN_POOL_SIZE):
     s = requests.Session()
-    s.headers.update({"x-api-key": METABASE_API_KEY})
+    s.headers.update({
+        "x-api-key": METABASE_API_KEY,
+        # CSV compresses 5-10x on the wire; iter_content decodes it transparently
+        "Accept-Encoding": "gzip, deflate",
+    })
+    # Retry transient failures (incl. POST exports), honouring Retry-After.
+    # CappedRetry jitters every wait so jobs that fired on the same cron tick
+    # don't retry in lockstep, and caps every wait (Retry-After included) at
+    # backoff_max, so the 5 retries sleep at most 5 x 60s = 300s in total.
+    retry = CappedRetry(
+        total=5, connect=5, read=5, status=5,
+        backoff_factor=1.0,
+        backoff_max=60,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "POST", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    # Keep-alive only pays off if every parallel worker gets a pooled
+    # connection; beyond pool_maxsize urllib3 opens and discards extras
+    adapter = HTTPAdapter(max_retries=retry,
+                          pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
     return s
 
-def get_card_name(session, card_id):
-    url = f"{METABASE_SITE}/api/card/{card_id}"
-    r = session.get(url, verify=VERIFY_SSL, timeout=30)
-    r.raise_for_status()
-    return r.json().get("name", f"Card_{card_id}")
-
 def build_params(params_dict):
     params = []
     for k, v in (params_dict or {}).items():
@@ -50,99 +122,459 @@ def build_params(params_dict):
         })
     return params
 
-def download_card_csv(session, card_id, out_path, params=None):
-    url = f"{METABASE_SITE}/api/card/{card_id}/query/csv"
+CONTENT_DISPOSITION_RE = re.compile(r"""filename\*?=(?:UTF-8'')?"?([^";]+)""", re.I)
+# Metabase appends the export time to the name, e.g. "My_Card_2024-05-01T06_00_00.csv"
+EXPORT_TIMESTAMP_RE = re.compile(r"_\d{4}-\d{2}-\d{2}T.*$")
+
+def export_name(r, card_id):
+    """Filename-safe card name from the export's Content-Disposition, without the timestamp."""
+    m = CONTENT_DISPOSITION_RE.search(r.headers.get("Content-Disposition", ""))
+    if not m:
+        return f"Card_{card_id}"
+    stem = EXPORT_TIMESTAMP_RE.sub("", os.path.splitext(unquote(m.group(1)))[0])
+    # Cleaned first: a name with no ASCII letters (e.g. Chinese) cleans to ""
+    stem = clean_filename(stem)
+    # "query_result" is Metabase's generic name when it has no card name to use
+    if not stem or stem == "query_result":
+        return f"Card_{card_id}"
+    return stem
+
+def card_params(card_id):
+    return CARD_PARAMS.get(str(card_id)) or CARD_PARAMS.get(card_id) or None
+
+def request_export(session, card_id, fmt, params=None):
+    """POST the card's export (csv/xlsx) and return the unread, streamed response."""
+    url = f"{METABASE_SITE}/api/card/{card_id}/query/{fmt}"
     payload = {}
     if params:
         payload["parameters"] = build_params(params)
-    r = session.post(url, json=payload, verify=VERIFY_SSL, timeout=60)
-    r.raise_for_status()
-    with open(out_path, "wb") as f:
-        f.write(r.content)
+    # One call per card; urllib3's Retry re-sends the already-encoded body
+    r = session.post(url, json=payload, stream=True,
+                     verify=VERIFY_SSL, timeout=(10, 300))
+    try:
+        r.raise_for_status()
+    except requests.HTTPError:
+        r.close()
+        raise
+    print(f"Card {card_id}: Content-Encoding={r.headers.get('Content-Encoding', 'identity')}")
+    return r
+
+def save_response(r, out_stream):
+    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+        if chunk:
+            out_stream.write(chunk)
+
+def download_card(session, card_id, fmt, out_stream, params=None):
+    """Stream the card's export (csv/xlsx) into out_stream and return the card name."""
+    with request_export(session, card_id, fmt, params) as r:
+        save_response(r, out_stream)
+        return export_name(r, card_id)
+
+# Formats that are already DEFLATE-compressed; re-compressing them is wasted CPU
+PRECOMPRESSED_EXTS = (".xlsx", ".zip", ".gz")
 
-def make_zip(files, zip_path):
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
-        for p in files:
-            z.write(p, arcname=os.path.basename(p))
+def open_zip_entry(z, arcname):
+    # An explicit ZipInfo, since a plain name would be dated 1980-01-01
+    info = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+    if arcname.lower().endswith(PRECOMPRESSED_EXTS):
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = z.compression
+        # Without this the entry falls back to zlib's default level 6;
+        # Python 3.13 renamed ZipInfo._compresslevel to compress_level
+        if hasattr(info, "compress_level"):
+            info.compress_level = z.compresslevel
+        else:
+            info._compresslevel = z.compresslevel
+    return z.open(info, "w", force_zip64=True)
+
+def make_zip(entries, zip_path):
+    """Write (arcname, file object) pairs into a new zip at zip_path."""
+    # compresslevel=1 is ~3x faster than the default on CSV for a few % in size
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+        for arcname, src in entries:
+            src.seek(0)
+            with open_zip_entry(z, arcname) as dst:
+                # Large reads amortise per-call overhead on big exports
+                shutil.copyfileobj(src, dst, length=CHUNK_SIZE)
+
+def max_zip_bytes(smtp):
+    """MAX_ZIP_BYTES, lowered to fit the server's advertised SIZE limit if any."""
+    try:
+        size = int(smtp.esmtp_features.get("size") or 0)
+    except ValueError:
+        size = 0
+    if not size:
+        return MAX_ZIP_BYTES
+    # Undo the base64 + CRLF growth, keeping 64 KiB for headers and body text
+    return min(MAX_ZIP_BYTES, int((size - 64 * 1024) * 3 / 4 * 76 / 78))
+
+def split_volumes(zip_path, max_bytes):
+    """Cut zip_path into .001, .002, ... byte ranges of at most max_bytes each.
+
+    The pieces are not zips on their own: 7-Zip opens the .001 directly,
+    or they can be joined back with `cat`.
+    """
+    count = -(-os.path.getsize(zip_path) // max_bytes)
+    parts = []
+    with open(zip_path, "rb") as src:
+        for i in range(1, count + 1):
+            part_path = f"{zip_path}.{i:03d}"
+            remaining = max_bytes
+            with open(part_path, "wb") as dst:
+                while remaining:
+                    block = src.read(min(CHUNK_SIZE, remaining))
+                    if not block:
+                        break
+                    dst.write(block)
+                    remaining -= len(block)
+            parts.append(part_path)
+    return parts
+
+def split_zip(zip_path, max_bytes):
+    """Repack zip_path into _partNN.zip files of at most max_bytes compressed each.
+
+    Entries are kept whole where possible, so every part is a normal zip.
+    If a single entry is over max_bytes that cannot work, and the zip is
+    cut into byte-level volumes instead (see split_volumes).
+    """
+    with zipfile.ZipFile(zip_path) as src:
+        infos = src.infolist()
+        if any(info.compress_size > max_bytes for info in infos):
+            return split_volumes(zip_path, max_bytes)
+
+        groups, size = [[]], 0
+        for info in infos:
+            if groups[-1] and size + info.compress_size > max_bytes:
+                groups.append([])
+                size = 0
+            groups[-1].append(info)
+            size += info.compress_size
+        if len(groups) == 1:
+            return [zip_path]
+
+        base = os.path.splitext(zip_path)[0]
+        parts = []
+        for i, group in enumerate(groups, 1):
+            part_path = f"{base}_part{i:02d}.zip"
+            with zipfile.ZipFile(part_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+                for info in group:
+                    with src.open(info) as f, open_zip_entry(z, info.filename) as dst:
+                        shutil.copyfileobj(f, dst, length=CHUNK_SIZE)
+            parts.append(part_path)
+    return parts
+
+def export(session, card_ids, fmt, out_zip):
+    """Download card_ids as `fmt` in parallel and zip them, in order, into out_zip."""
+    downloads = {}
+    entries = []
+    seen = set()
+
+    def download(cid):
+        # Spills to an anonymous temp file only if the card is large
+        buf = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX)
+        try:
+            card_name = download_card(session, cid, fmt, buf, params=card_params(cid))
+        except BaseException:
+            buf.close()
+            raise
+        return card_name, buf
+
+    try:
+        # Download all cards in parallel (network-bound)
+        with ThreadPoolExecutor(max_workers=min(8, len(card_ids))) as pool:
+            downloads = {cid: pool.submit(download, cid) for cid in card_ids}
+            # Keep zip entries in card_ids order
+            for cid in card_ids:
+                card_name, buf = downloads[cid].result()
+                arcname = f"{card_name}.{fmt}"
+                # Duplicate names make unzip tools overwrite one report
+                # with another; the card id keeps them apart
+                if arcname in seen:
+                    arcname = f"{card_name}_{cid}.{fmt}"
+                seen.add(arcname)
+                print(f"Downloaded: {card_name} → {arcname}")
+                entries.append((arcname, buf))
+
+        make_zip(entries, out_zip)
+    finally:
+        for fut in downloads.values():
+            if fut.done() and not fut.exception():
+                fut.result()[1].close()
 
 # ---------- Email ----------
-def send_email(zip_path):
+# 57 raw bytes encode to exactly one 76-char base64 line
+B64_BLOCK = 57 * 16 * 1024
+
+def iter_base64(f):
+    while True:
+        block = f.read(B64_BLOCK)
+        if not block:
+            break
+        yield base64.encodebytes(block).replace(b"\n", b"\r\n")
+
+class Base64Writer:
+    """Write-only file object that hands base64 CRLF lines to `emit`."""
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.pending = b""
+
+    def write(self, data):
+        buf = self.pending + data
+        cut = len(buf) - len(buf) % 57
+        if cut:
+            self.emit(base64.encodebytes(buf[:cut]).replace(b"\n", b"\r\n"))
+        self.pending = buf[cut:]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.pending:
+            self.emit(base64.encodebytes(self.pending).replace(b"\n", b"\r\n"))
+            self.pending = b""
+
+def iter_zipped_response(r, arcname):
+    """Base64 lines of a one-entry zip, compressed straight from the HTTP response."""
+    lines = []
+    b64 = Base64Writer(lines.append)
+    # zipfile falls back to data descriptors on an unseekable file, so the
+    # archive can be written front to back without knowing sizes up front
+    with zipfile.ZipFile(b64, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+        with open_zip_entry(z, arcname) as dst:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                dst.write(chunk)
+                if lines:
+                    yield b"".join(lines)
+                    lines.clear()
+    b64.close()
+    yield b"".join(lines)
+
+def iter_message(subject, body, to_list, cc_list, filename, attachment):
+    """Yield a multipart/mixed message as CRLF-terminated chunks.
+
+    `attachment` yields base64 lines, so the attachment is never held in
+    memory as a whole (EmailMessage.add_attachment would need all of it).
+    """
+    boundary = f"==={uuid.uuid4().hex}==="
+    headers = [("Subject", subject), ("From", FROM_EMAIL), ("To", ", ".join(to_list))]
+    if cc_list:
+        headers.append(("Cc", ", ".join(cc_list)))
+    headers += [
+        ("MIME-Version", "1.0"),
+        ("Content-Type", f'multipart/mixed; boundary="{boundary}"'),
+    ]
+    yield b"".join(SMTP_POLICY.fold_binary(k, v) for k, v in headers) + b"\r\n"
+
+    text = EmailMessage(policy=SMTP_POLICY)
+    text.set_content(body)
+    del text["MIME-Version"]
+    yield f"--{boundary}\r\n".encode() + text.as_bytes()
+
+    att = EmailMessage(policy=SMTP_POLICY)
+    # Split volumes (.zip.001, ...) are not zips on their own
+    att["Content-Type"] = "application/zip" if filename.endswith(".zip") else "application/octet-stream"
+    att["Content-Transfer-Encoding"] = "base64"
+    att.add_header("Content-Disposition", "attachment", filename=filename)
+    yield f"--{boundary}\r\n".encode() + att.as_bytes()
+    yield from attachment
+    yield f"--{boundary}--\r\n".encode()
+
+def sendmail_stream(smtp, from_addr, to_addrs, chunks):
+    """Like smtp.sendmail, but writes the DATA section chunk by chunk.
+
+    Every chunk must end on a line boundary (for dot-stuffing).
+    Returns the refused-recipients dict, as sendmail does.
+    """
+    smtp.ehlo_or_helo_if_needed()
+    if smtp.has_extn("pipelining"):
+        # RFC 2920: one write for MAIL and every RCPT, then read the replies,
+        # instead of a round-trip per recipient
+        cmds = [f"MAIL FROM:{smtplib.quoteaddr(from_addr)}"]
+        cmds += [f"RCPT TO:{smtplib.quoteaddr(addr)}" for addr in to_addrs]
+        smtp.send("".join(f"{c}\r\n" for c in cmds))
+        mail_reply, *rcpt_replies = [smtp.getreply() for _ in cmds]
+    else:
+        mail_reply = smtp.mail(from_addr)
+        rcpt_replies = [smtp.rcpt(addr) for addr in to_addrs] if mail_reply[0] == 250 else []
+    code, resp = mail_reply
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    # A bad address only drops that recipient, as with smtp.sendmail
+    refused = {addr: reply for addr, reply in zip(to_addrs, rcpt_replies)
+               if reply[0] not in (250, 251)}
+    if len(refused) == len(to_addrs):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+    code, resp = smtp.docmd("DATA")
+    if code != 354:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, resp)
+    try:
+        for chunk in chunks:
+            smtp.send(re.sub(rb"(?m)^\.", b"..", chunk))
+        smtp.send(b".\r\n")
+    except BaseException:
+        # Mid-DATA there is no clean way back; dropping the connection
+        # makes the server discard the partial message
+        smtp.close()
+        raise
+    code, resp = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
+
+def connect_smtp():
+    # Without a timeout a stalled server hangs the job until Actions kills it
+    smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+    try:
+        smtp.starttls(context=ssl.create_default_context())
+        smtp.login(SMTP_USER, SMTP_PASS)
+    except BaseException:
+        smtp.close()
+        raise
+    return smtp
+
+def close_smtp(smtp):
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+def ensure_smtp(smtp):
+    """Return smtp if still usable, else a fresh login (servers drop idle sessions)."""
+    try:
+        if smtp.noop()[0] == 250:
+            return smtp
+    except (smtplib.SMTPException, OSError):
+        pass
+    smtp.close()
+    return connect_smtp()
+
+def send_email(smtp, filename, attachment, part=None):
+    """Send the report email; `attachment` yields the zip as base64 lines.
+
+    `part` is (n, total) when the report is split across several emails.
+    """
     subject = "VI Daily Reports (D-1), Yesterday"
+    if part:
+        subject += f" (part {part[0]}/{part[1]})"
 
     body = (
         "Hi Team,\n\n"
         "Please find Immediate Callback Report & Disposition History Report "
         "for yesterday's campaigns attached below.\n\n"
-        "Thank You\n"
     )
+    if not filename.endswith(".zip"):
+        body += (
+            "The report was too large for one email, so the zip is split "
+            "into numbered pieces across these emails. Save all of them in "
+            "one folder and open the .001 file with 7-Zip, or join them "
+            "with: cat *.zip.0* > report.zip\n\n"
+        )
+    body += "Thank You\n"
 
     # Parse recipients
     to_list = [e.strip() for e in TO_EMAIL.split(",") if e.strip()]
     cc_list = [e.strip() for e in CC_EMAIL.split(",") if e.strip()]
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = FROM_EMAIL
-    msg["To"] = ", ".join(to_list)
-    if cc_list:
-        msg["Cc"] = ", ".join(cc_list)
-    msg.set_content(body)
-
-    # Attach zip
-    with open(zip_path, "rb") as f:
-        msg.add_attachment(
-            f.read(),
-            maintype="application",
-            subtype="zip",
-            filename=os.path.basename(zip_path)
-        )
-
     # Final recipient list
     recipients = to_list + cc_list
 
-    context = ssl.create_default_context()
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as smtp:
-        smtp.starttls(context=context)
-        smtp.login(SMTP_USER, SMTP_PASS)
-        smtp.send_message(msg, from_addr=FROM_EMAIL, to_addrs=recipients)
+    chunks = iter_message(subject, body, to_list, cc_list, filename, attachment)
+    refused = sendmail_stream(smtp, FROM_EMAIL, recipients, chunks)
+    for addr, (code, resp) in refused.items():
+        print(f"Recipient refused: {addr} ({code} {resp.decode(errors='replace')})")
+
+def send_zip(smtp, zip_path):
+    """Email zip_path, split across several emails if it is over the size cap."""
+    # Oversized mail is rejected outright, wasting every download
+    limit = max_zip_bytes(smtp)
+    if os.path.getsize(zip_path) > limit:
+        parts = split_zip(zip_path, limit)
+    else:
+        parts = [zip_path]
+    for i, part_path in enumerate(parts, 1):
+        # Attach zip, base64-encoding it block by block on the way out
+        with open(part_path, "rb") as f:
+            send_email(smtp, os.path.basename(part_path), iter_base64(f),
+                       part=(i, len(parts)) if len(parts) > 1 else None)
 
 # ---------- Main ----------
-def main():
-    session = make_session()
+def parse_card_ids(value):
+    ids = [int(c) for c in value.split(",") if c.strip()]
+    if not ids:
+        raise argparse.ArgumentTypeError("no card ids given")
+    # Repeats would download (and zip) the same card twice
+    return list(dict.fromkeys(ids))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Metabase cards and email them as a zip.")
+    parser.add_argument("--format", choices=("csv", "xlsx"), default="csv",
+                        help="export format (default: %(default)s)")
+    parser.add_argument("--cards", type=parse_card_ids, default=CARD_IDS,
+                        help="comma-separated card ids (default: %(default)s)")
+    args = parser.parse_args(argv)
+    require_env()
+
+    session = make_session(max(MIN_POOL_SIZE, len(args.cards)))
     tmpdir = tempfile.mkdtemp(prefix="metabase_export_")
-    csv_paths = []
+    zip_name = f"VI_Daily_Reports_{datetime.now().strftime('%Y%m%d')}.zip"
+    zip_path = os.path.join(tmpdir, zip_name)
+    smtp = None
+    # STARTTLS + AUTH overlaps the downloads instead of following the zip
+    smtp_pool = ThreadPoolExecutor(max_workers=1)
+    smtp_future = smtp_pool.submit(connect_smtp)
 
     try:
-        # Download each card
-        for cid in CARD_IDS:
-            card_name = get_card_name(session, cid)
-            clean_name = clean_filename(card_name)
-            csv_path = os.path.join(tmpdir, f"{clean_name}.csv")
-
-            print(f"Downloading: {card_name} → {csv_path}")
-
-            params = CARD_PARAMS.get(str(cid)) or CARD_PARAMS.get(cid) or None
-            download_card_csv(session, cid, csv_path, params=params)
-            csv_paths.append(csv_path)
-
-        # Create zip
-        zip_path = os.path.join(
-            tmpdir,
-            f"VI_Daily_Reports_{datetime.now().strftime('%Y%m%d')}.zip"
-        )
-        make_zip(csv_paths, zip_path)
+        if len(args.cards) == 1:
+            # One card: HTTP response → zip → base64 → SMTP DATA, with no
+            # disk or full-size buffer in between. The export request is
+            # made first so a failing card never opens a half-sent message.
+            cid = args.cards[0]
+            with request_export(session, cid, args.format, card_params(cid)) as r:
+                arcname = f"{export_name(r, cid)}.{args.format}"
+                smtp = ensure_smtp(smtp_future.result())
+                # A streamed message can't be split once it is under way, so
+                # only stream when Content-Length shows it fits. 10% headroom
+                # covers our level-1 deflate coming out a little larger than
+                # the server's gzip. Chunked responses have no length.
+                length = int(r.headers.get("Content-Length") or 0)
+                streamed = 0 < length and length * 11 // 10 <= max_zip_bytes(smtp)
+                if streamed:
+                    print(f"Streaming: {arcname}")
+                    print("Sending email...")
+                    send_email(smtp, zip_name, iter_zipped_response(r, arcname))
+                else:
+                    # Reuse the open response rather than re-running the query
+                    print(f"Downloading: {arcname}")
+                    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX) as buf:
+                        save_response(r, buf)
+                        make_zip([(arcname, buf)], zip_path)
+            if not streamed:
+                print("Sending email...")
+                send_zip(smtp, zip_path)
+        else:
+            export(session, args.cards, args.format, zip_path)
 
-        print("Sending email...")
-        send_email(zip_path)
+            print("Sending email...")
+            smtp = ensure_smtp(smtp_future.result())
+            send_zip(smtp, zip_path)
         print("Email sent!")
 
     finally:
-        # Clean up
-        for f in csv_paths:
-            try: os.remove(f)
-            except: pass
-        try: os.remove(zip_path)
-        except: pass
+        # Clean up (the zip, any parts, and the directory itself)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        # All cards share this session's pool; release it once at the end
+        session.close()
+        smtp_pool.shutdown()
+        if smtp is None and not smtp_future.exception():
+            smtp = smtp_future.result()
+        if smtp is not None:
+            close_smtp(smtp)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()